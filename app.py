@@ -4,7 +4,7 @@ import os
 import google.generativeai as genai
 from urllib.parse import urlparse, parse_qs
 from youtube_transcript_api import YouTubeTranscriptApi
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import sqlite3
 from pathlib import Path
@@ -12,6 +12,19 @@ import base64
 from io import BytesIO
 import re
 import graphviz
+import numpy as np
+import hashlib
+import threading
+import time
+import uuid
+import tempfile
+import zipfile
+import urllib.parse
+import urllib.request
+import zlib
+import math
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # PDF generation imports
 try:
@@ -24,6 +37,9 @@ load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 # ==================== DATABASE SETUP ====================
+HISTORY_COLUMNS = ['id', 'video_id', 'video_url', 'title', 'summary', 'transcript', 'language',
+                   'timestamps', 'created_at', 'is_favorite', 'summary_variants']
+
 def init_database():
     """Initialize SQLite database for history"""
     db_path = Path("summary_history.db")
@@ -45,18 +61,75 @@ def init_database():
         )
     ''')
     
+    # Columns added after the initial schema
+    existing_columns = {row[1] for row in cursor.execute('PRAGMA table_info(summaries)')}
+    if 'summary_variants' not in existing_columns:
+        try:
+            cursor.execute('ALTER TABLE summaries ADD COLUMN summary_variants TEXT')
+        except sqlite3.OperationalError:
+            pass  # Another session added it concurrently
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS video_metadata (
+            video_id TEXT PRIMARY KEY,
+            title TEXT,
+            channel TEXT,
+            duration REAL,
+            thumbnail_path TEXT,
+            fetched_at TIMESTAMP
+        )
+    ''')
+    
+    # MinHash signatures and LSH buckets for near-duplicate transcript lookup
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transcript_minhash (
+            summary_id INTEGER PRIMARY KEY,
+            signature BLOB
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transcript_lsh (
+            bucket TEXT,
+            summary_id INTEGER
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transcript_lsh_bucket ON transcript_lsh (bucket)')
+    
+    # Chat answers shared across sessions, keyed by video and transcript version
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_id TEXT,
+            transcript_hash TEXT,
+            question TEXT,
+            normalized_question TEXT,
+            answer TEXT,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP,
+            UNIQUE (video_id, transcript_hash, normalized_question)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS answer_cache_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER DEFAULT 0
+        )
+    ''')
+    
     conn.commit()
     conn.close()
 
-def save_to_history(video_id, video_url, title, summary, transcript, language, timestamps):
+def save_to_history(video_id, video_url, title, summary, transcript, language, timestamps, summary_variants=None):
     """Save summary to history"""
     conn = sqlite3.connect("summary_history.db")
     cursor = conn.cursor()
     
     cursor.execute('''
-        INSERT INTO summaries (video_id, video_url, title, summary, transcript, language, timestamps, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (video_id, video_url, title, summary, transcript, language, json.dumps(timestamps), datetime.now()))
+        INSERT INTO summaries (video_id, video_url, title, summary, transcript, language, timestamps, created_at, summary_variants)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (video_id, video_url, title, summary, transcript, language, json.dumps(timestamps), datetime.now(),
+          json.dumps(summary_variants) if summary_variants else None))
+    index_transcript(cursor, cursor.lastrowid, transcript)
     
     conn.commit()
     conn.close()
@@ -87,9 +160,462 @@ def delete_from_history(summary_id):
     cursor = conn.cursor()
     
     cursor.execute('DELETE FROM summaries WHERE id = ?', (summary_id,))
+    cursor.execute('DELETE FROM transcript_minhash WHERE summary_id = ?', (summary_id,))
+    cursor.execute('DELETE FROM transcript_lsh WHERE summary_id = ?', (summary_id,))
     conn.commit()
     conn.close()
 
+def get_summary_by_id(summary_id):
+    """Retrieve a single history row as a dict"""
+    conn = sqlite3.connect("summary_history.db")
+    cursor = conn.cursor()
+    
+    cursor.execute(f"SELECT {', '.join(HISTORY_COLUMNS)} FROM summaries WHERE id = ?", (summary_id,))
+    row = cursor.fetchone()
+    conn.close()
+    
+    return dict(zip(HISTORY_COLUMNS, row)) if row else None
+
+# ==================== NEAR-DUPLICATE DETECTION ====================
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16  # 8 rows per band: candidates start to appear around 70% similarity
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+
+# Fixed seed so signatures stored in the database stay comparable across restarts
+_minhash_rng = np.random.default_rng(7919)
+MINHASH_A = _minhash_rng.integers(0, 2**63, MINHASH_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+MINHASH_B = _minhash_rng.integers(0, 2**63, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+def minhash_signature(transcript, chunk_size=4096):
+    """MinHash signature over word shingles, or None for an empty transcript.
+
+    Uses multiply-shift hashing ((a * x + b) mod 2^64) >> 32 on CRC32 shingle
+    hashes; shingles are processed in chunks to bound memory on long transcripts.
+    """
+    words = re.findall(r"[a-z0-9']+", (transcript or "").lower())
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    signature = np.full(MINHASH_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(hashes), chunk_size):
+        chunk = hashes[start:start + chunk_size, None]
+        permuted = (chunk * MINHASH_A + MINHASH_B) >> np.uint64(32)
+        signature = np.minimum(signature, permuted.min(axis=0))
+    return signature.astype("<u4")
+
+def lsh_buckets(signature):
+    """One bucket key per band; the band number is part of the key so buckets never collide across bands"""
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    return [f"{band}:" + hashlib.md5(signature[band * rows:(band + 1) * rows].tobytes()).hexdigest()[:16]
+            for band in range(LSH_BANDS)]
+
+def index_transcript(cursor, summary_id, transcript):
+    """Add a history row's transcript to the near-duplicate index"""
+    signature = minhash_signature(transcript)
+    if signature is None:
+        # NULL signature marks the row as indexed so it is not re-read on every lookup
+        cursor.execute('INSERT OR REPLACE INTO transcript_minhash (summary_id, signature) VALUES (?, NULL)', (summary_id,))
+        return
+    cursor.execute('INSERT OR REPLACE INTO transcript_minhash (summary_id, signature) VALUES (?, ?)',
+                   (summary_id, signature.tobytes()))
+    cursor.executemany('INSERT INTO transcript_lsh (bucket, summary_id) VALUES (?, ?)',
+                       [(bucket, summary_id) for bucket in lsh_buckets(signature)])
+
+def index_missing_transcripts():
+    """Index history rows saved before the near-duplicate index existed"""
+    conn = sqlite3.connect("summary_history.db")
+    cursor = conn.cursor()
+    
+    missing_ids = [row[0] for row in cursor.execute(
+        'SELECT id FROM summaries WHERE id NOT IN (SELECT summary_id FROM transcript_minhash)')]
+    for summary_id in missing_ids:
+        transcript = cursor.execute('SELECT transcript FROM summaries WHERE id = ?', (summary_id,)).fetchone()[0]
+        index_transcript(cursor, summary_id, transcript)
+    
+    conn.commit()
+    conn.close()
+
+def find_near_duplicate(transcript, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Return the most similar saved summary whose transcript is at least `threshold` similar, or None"""
+    signature = minhash_signature(transcript)
+    if signature is None:
+        return None
+    index_missing_transcripts()
+    
+    conn = sqlite3.connect("summary_history.db")
+    cursor = conn.cursor()
+    
+    buckets = lsh_buckets(signature)
+    cursor.execute(f'''
+        SELECT m.summary_id, m.signature FROM transcript_minhash m
+        WHERE m.summary_id IN (SELECT summary_id FROM transcript_lsh WHERE bucket IN ({", ".join("?" * len(buckets))}))
+    ''', buckets)
+    best_id, best_similarity = None, threshold
+    for summary_id, candidate in cursor.fetchall():
+        similarity = float(np.mean(np.frombuffer(candidate, dtype="<u4") == signature))
+        if similarity >= best_similarity:
+            best_id, best_similarity = summary_id, similarity
+    
+    match = None
+    if best_id is not None:
+        cursor.execute('SELECT id, video_id, title, created_at FROM summaries WHERE id = ?', (best_id,))
+        row = cursor.fetchone()
+        if row:
+            match = {'summary_id': row[0], 'video_id': row[1], 'title': row[2], 'created_at': row[3],
+                     'similarity': best_similarity}
+    conn.close()
+    return match
+
+# ==================== SESSION DATA MANAGER ====================
+SESSION_MEMORY_BUDGET = int(os.getenv("SESSION_MEMORY_BUDGET_MB", "256")) * 1024 * 1024
+SESSION_SPILL_DIR = Path(os.getenv("SESSION_SPILL_DIR", ".session_spill"))
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+SESSION_EXPIRE_TTL = int(os.getenv("SESSION_EXPIRE_TTL_SECONDS", "604800"))
+SESSION_SWEEP_INTERVAL = 60
+MAX_CHAT_HISTORY = 50
+
+class SessionDataManager:
+    """Process-wide, reference-counted store for large per-session artifacts.
+
+    Artifacts are keyed by the hash of their JSON encoding, so the same
+    transcript opened by many sessions is held once. When resident bytes exceed
+    the budget, artifacts belonging only to the least recently used sessions
+    are spilled to disk and reloaded transparently on the next access. Sessions
+    idle for longer than idle_ttl are spilled regardless of the budget, and only
+    sessions idle for longer than expire_ttl are dropped entirely.
+
+    Artifacts are held as encoded bytes and decoded on every get, so a caller
+    modifying a returned value never affects other sessions sharing it.
+    """
+
+    def __init__(self, budget_bytes=SESSION_MEMORY_BUDGET, spill_dir=SESSION_SPILL_DIR,
+                 idle_ttl=SESSION_IDLE_TTL, expire_ttl=SESSION_EXPIRE_TTL):
+        self.budget_bytes = budget_bytes
+        self.spill_dir = Path(spill_dir)
+        self.idle_ttl = idle_ttl
+        self.expire_ttl = expire_ttl
+        self.last_sweep = 0
+        self.lock = threading.RLock()
+        self.blobs = {}  # key -> {'data', 'size', 'refs', 'resident'}
+        self.sessions = OrderedDict()  # session_id -> {'artifacts': {name: key}, 'last_seen': ts}, LRU first
+        self.resident_bytes = 0
+        # Spill files from an earlier server process belong to sessions that no longer exist
+        for path in self.spill_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def _touch(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = {'artifacts': {}, 'last_seen': time.time()}
+            self.sessions[session_id] = session
+        session['last_seen'] = time.time()
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def _spill_path(self, key):
+        return self.spill_dir / f"{key}.json"
+
+    def _release(self, key):
+        blob = self.blobs[key]
+        blob['refs'] -= 1
+        if blob['refs'] > 0:
+            return
+        if blob['resident']:
+            self.resident_bytes -= blob['size']
+        self._spill_path(key).unlink(missing_ok=True)
+        del self.blobs[key]
+
+    def put(self, session_id, name, value):
+        """Store an artifact for a session, replacing any previous value under the same name"""
+        encoded = json.dumps(value).encode("utf-8")
+        key = hashlib.sha256(encoded).hexdigest()
+        with self.lock:
+            session = self._touch(session_id)
+            if session['artifacts'].get(name) == key:
+                return
+            blob = self.blobs.get(key)
+            if blob is None:
+                self.blobs[key] = {'data': encoded, 'size': len(encoded), 'refs': 1, 'resident': True}
+                self.resident_bytes += len(encoded)
+            else:
+                blob['refs'] += 1
+                self._load(key)
+            old_key = session['artifacts'].get(name)
+            session['artifacts'][name] = key
+            if old_key is not None:
+                self._release(old_key)
+            self._enforce_budget(session_id)
+
+    def get(self, session_id, name, default=None):
+        """Return a session artifact, reloading it from disk if it was spilled"""
+        with self.lock:
+            session = self._touch(session_id)
+            key = session['artifacts'].get(name)
+            if key is None:
+                return default
+            data = self._load(key)
+            self._enforce_budget(session_id)
+        return json.loads(data)
+
+    def has(self, session_id, name):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            return session is not None and name in session['artifacts']
+
+    def drop(self, session_id, name):
+        """Remove a single artifact from a session"""
+        with self.lock:
+            session = self._touch(session_id)
+            key = session['artifacts'].pop(name, None)
+            if key is not None:
+                self._release(key)
+
+    def release_session(self, session_id):
+        """Drop every artifact held by a session"""
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            if session is None:
+                return
+            for key in session['artifacts'].values():
+                self._release(key)
+
+    def _load(self, key):
+        blob = self.blobs[key]
+        if not blob['resident']:
+            blob['data'] = self._spill_path(key).read_bytes()
+            blob['resident'] = True
+            self.resident_bytes += blob['size']
+        return blob['data']
+
+    def _spill(self, key):
+        blob = self.blobs[key]
+        path = self._spill_path(key)
+        if not path.exists():
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(blob['data'])
+        blob['data'] = None
+        blob['resident'] = False
+        self.resident_bytes -= blob['size']
+
+    def _sweep_idle_sessions(self, active_session_id):
+        """Spill artifacts only used by idle sessions and drop sessions past the expiry TTL"""
+        now = time.time()
+        if now - self.last_sweep < SESSION_SWEEP_INTERVAL:
+            return
+        self.last_sweep = now
+
+        for session_id in [sid for sid, s in self.sessions.items() if now - s['last_seen'] > self.expire_ttl]:
+            if session_id != active_session_id:
+                self.release_session(session_id)
+
+        hot_keys = set()
+        for session_id, session in self.sessions.items():
+            if session_id == active_session_id or now - session['last_seen'] <= self.idle_ttl:
+                hot_keys.update(session['artifacts'].values())
+        for key, blob in self.blobs.items():
+            if key not in hot_keys and blob['resident']:
+                self._spill(key)
+
+    def _enforce_budget(self, active_session_id):
+        self._sweep_idle_sessions(active_session_id)
+
+        if self.resident_bytes <= self.budget_bytes:
+            return
+        active_keys = set(self.sessions[active_session_id]['artifacts'].values()) if active_session_id in self.sessions else set()
+        for session_id, session in list(self.sessions.items()):
+            if session_id == active_session_id:
+                continue
+            for key in session['artifacts'].values():
+                if key not in active_keys and self.blobs[key]['resident']:
+                    self._spill(key)
+                    if self.resident_bytes <= self.budget_bytes:
+                        return
+
+    def session_bytes(self, session_id):
+        """Bytes referenced by a session (shared artifacts count in full for each session)"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return 0
+            return sum(self.blobs[key]['size'] for key in session['artifacts'].values())
+
+    def stats(self):
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'artifacts': len(self.blobs),
+                'resident_bytes': self.resident_bytes,
+                'spilled_bytes': sum(b['size'] for b in self.blobs.values() if not b['resident']),
+                'budget_bytes': self.budget_bytes,
+            }
+
+@st.cache_resource
+def get_session_manager():
+    """Single SessionDataManager shared by every session in this process"""
+    return SessionDataManager()
+
+def get_session_id():
+    """Stable identifier for the current browser session"""
+    if 'session_id' not in st.session_state:
+        st.session_state['session_id'] = uuid.uuid4().hex
+    return st.session_state['session_id']
+
+def session_put(name, value):
+    get_session_manager().put(get_session_id(), name, value)
+
+def session_get(name, default=None):
+    return get_session_manager().get(get_session_id(), name, default)
+
+def session_has(name):
+    return get_session_manager().has(get_session_id(), name)
+
+def session_drop(name):
+    get_session_manager().drop(get_session_id(), name)
+
+def append_chat_history(question, answer, cached=False):
+    """Append a chat turn, keeping only the most recent MAX_CHAT_HISTORY turns"""
+    chat_history = session_get('chat_history', [])
+    chat_history = (chat_history + [{"q": question, "a": answer, "cached": cached}])[-MAX_CHAT_HISTORY:]
+    session_put('chat_history', chat_history)
+
+# ==================== VIDEO METADATA CACHE ====================
+THUMBNAIL_CACHE_DIR = Path(os.getenv("THUMBNAIL_CACHE_DIR", ".thumbnail_cache"))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_MB", "100")) * 1024 * 1024
+METADATA_FETCH_TIMEOUT = 5
+METADATA_RETRY_INTERVAL = 3600
+VIDEO_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{11}")
+
+def is_valid_video_id(video_id):
+    """YouTube video IDs are exactly 11 URL-safe characters"""
+    return bool(video_id) and VIDEO_ID_PATTERN.fullmatch(video_id) is not None
+
+def get_cached_metadata(video_id):
+    """Return stored metadata for a video, or None if it was never fetched"""
+    conn = sqlite3.connect("summary_history.db")
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT title, channel, duration, thumbnail_path, fetched_at FROM video_metadata WHERE video_id = ?', (video_id,))
+    row = cursor.fetchone()
+    conn.close()
+    
+    if row is None:
+        return None
+    title, channel, duration, thumbnail_path, fetched_at = row
+    if thumbnail_path and Path(thumbnail_path).exists():
+        os.utime(thumbnail_path)  # mark as recently used for eviction
+    else:
+        thumbnail_path = None
+    return {'video_id': video_id, 'title': title, 'channel': channel, 'duration': duration,
+            'thumbnail_path': thumbnail_path, 'fetched_at': fetched_at}
+
+def download_thumbnail(video_id):
+    """Download the video thumbnail into the on-disk cache and return its path"""
+    if not is_valid_video_id(video_id):
+        raise ValueError(f"Invalid video ID: '{video_id}'")
+    THUMBNAIL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = THUMBNAIL_CACHE_DIR / f"{video_id}.jpg"
+    with urllib.request.urlopen(f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg", timeout=METADATA_FETCH_TIMEOUT) as response:
+        path.write_bytes(response.read())
+    evict_thumbnails()
+    return str(path)
+
+def evict_thumbnails():
+    """Delete least recently used thumbnails until the cache fits its size budget"""
+    files = sorted(THUMBNAIL_CACHE_DIR.glob("*.jpg"), key=lambda f: f.stat().st_mtime)
+    total = sum(f.stat().st_size for f in files)
+    for f in files:
+        if total <= THUMBNAIL_CACHE_MAX_BYTES:
+            break
+        total -= f.stat().st_size
+        f.unlink(missing_ok=True)
+
+def fetch_video_metadata(video_id):
+    """Fetch title, channel and thumbnail from YouTube and store them.
+
+    Failures are stored too (with empty fields and fetched_at set) so a failing
+    video does not cause a network request on every rerun; get_video_metadata
+    retries them after METADATA_RETRY_INTERVAL and prefetch_video_metadata on demand.
+    """
+    if not is_valid_video_id(video_id):
+        raise ValueError(f"Invalid video ID: '{video_id}'")
+    title = channel = thumbnail_path = None
+    try:
+        oembed_url = "https://www.youtube.com/oembed?format=json&url=" + \
+            urllib.parse.quote(f"https://www.youtube.com/watch?v={video_id}", safe="")
+        with urllib.request.urlopen(oembed_url, timeout=METADATA_FETCH_TIMEOUT) as response:
+            oembed = json.loads(response.read().decode("utf-8"))
+        title = oembed.get('title')
+        channel = oembed.get('author_name')
+    except Exception:
+        pass
+    try:
+        thumbnail_path = download_thumbnail(video_id)
+    except Exception:
+        pass
+    
+    conn = sqlite3.connect("summary_history.db")
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        INSERT INTO video_metadata (video_id, title, channel, thumbnail_path, fetched_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(video_id) DO UPDATE SET
+            title = COALESCE(excluded.title, title),
+            channel = COALESCE(excluded.channel, channel),
+            thumbnail_path = COALESCE(excluded.thumbnail_path, thumbnail_path),
+            fetched_at = excluded.fetched_at
+    ''', (video_id, title, channel, thumbnail_path, datetime.now()))
+    if title:
+        cursor.execute('UPDATE summaries SET title = ? WHERE video_id = ? AND title = ?', (title, video_id, f"Video {video_id}"))
+    
+    conn.commit()
+    conn.close()
+    return get_cached_metadata(video_id)
+
+def get_video_metadata(video_id):
+    """Metadata for a video, fetched from YouTube only the first time it is seen.
+
+    Incomplete entries (failed title or thumbnail fetch, evicted thumbnail) are
+    retried at most once per METADATA_RETRY_INTERVAL so reruns stay off the network.
+    """
+    metadata = get_cached_metadata(video_id)
+    if metadata is None or metadata['fetched_at'] is None:
+        return fetch_video_metadata(video_id)
+    incomplete = metadata['title'] is None or metadata['thumbnail_path'] is None
+    age = (datetime.now() - datetime.fromisoformat(str(metadata['fetched_at']))).total_seconds()
+    if incomplete and age > METADATA_RETRY_INTERVAL:
+        return fetch_video_metadata(video_id)
+    return metadata
+
+def set_video_duration(video_id, duration):
+    """Record the video duration (derived from the transcript's last caption)"""
+    conn = sqlite3.connect("summary_history.db")
+    conn.execute('INSERT INTO video_metadata (video_id, duration) VALUES (?, ?) '
+                 'ON CONFLICT(video_id) DO UPDATE SET duration = excluded.duration', (video_id, duration))
+    conn.commit()
+    conn.close()
+
+def prefetch_video_metadata(video_ids, max_workers=8):
+    """Fetch metadata for many videos in parallel, skipping ones already complete; returns the fetched count"""
+    missing = []
+    for video_id in dict.fromkeys(v for v in video_ids if is_valid_video_id(v)):
+        metadata = get_cached_metadata(video_id)
+        if metadata is None or metadata['title'] is None or metadata['thumbnail_path'] is None:
+            missing.append(video_id)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(fetch_video_metadata, missing))
+    return len(missing)
+
+def format_duration(seconds):
+    """Convert seconds to H:MM:SS or MM:SS format"""
+    hours = int(seconds // 3600)
+    if hours:
+        return f"{hours}:{format_timestamp(seconds % 3600)}"
+    return format_timestamp(seconds)
+
 # ==================== HELPER FUNCTIONS ====================
 def extract_video_id(youtube_url):
     """Extract video ID from various YouTube URL formats"""
@@ -111,7 +637,7 @@ def extract_transcript_details(youtube_video_url):
     try:
         video_id = extract_video_id(youtube_video_url)
         
-        if not video_id or len(video_id) != 11:
+        if not is_valid_video_id(video_id):
             raise Exception(f"Invalid video ID: '{video_id}'")
         
         transcript_text = ""
@@ -161,12 +687,127 @@ def extract_transcript_details(youtube_video_url):
     except Exception as e:
         raise e
 
+# ==================== TRANSCRIPT PREPROCESSING ====================
+TRANSCRIPT_CLEANUP = {
+    'remove_annotations': True,   # [Music], [Applause], ♪ ...
+    'remove_fillers': True,       # um, uh, hmm ...
+    'remove_overlap': True,       # rolling-caption text repeated from the previous snippet
+    'collapse_repeats': True,     # "the the the" -> "the" (doubled words are kept)
+}
+ANNOTATION_PATTERN = re.compile(r"\[[^\]]*\]|\([^)]*(?:music|applause|laughter|inaudible)[^)]*\)|[♪♫]+", re.IGNORECASE)
+FILLER_PATTERN = re.compile(r"\b(?:u+m+|u+h+|e+r+m+|h+m+|m+h+m+|a+h+)\b[,.]?", re.IGNORECASE)
+# Three or more repeats only: doubled words like "that that" or "had had" are often grammatical
+REPEATED_WORD_PATTERN = re.compile(r"\b(\w+)(?:\s+\1\b){2,}", re.IGNORECASE)
+MAX_CAPTION_OVERLAP_WORDS = 12
+
+def strip_caption_overlap(previous_words, words):
+    """Drop the leading words of a snippet that repeat the end of the previous snippet"""
+    for size in range(min(len(previous_words), len(words), MAX_CAPTION_OVERLAP_WORDS), 1, -1):
+        if [w.lower() for w in previous_words[-size:]] == [w.lower() for w in words[:size]]:
+            return words[size:]
+    if words and [w.lower() for w in words] == [w.lower() for w in previous_words[-len(words):]]:
+        return []
+    return words
+
+def preprocess_transcript(timestamps_data, options=None):
+    """Normalize caption snippets once before any LLM call.
+
+    Returns the cleaned transcript text, the cleaned segments and stats
+    describing how much the transcript shrank. Each segment keeps its original
+    snippet's start and duration, which map it back to the video. The original
+    snippets are not kept, because callers replace them with the cleaned segments.
+    """
+    options = {**TRANSCRIPT_CLEANUP, **(options or {})}
+    segments = []
+    previous_words = []
+    for snippet in timestamps_data:
+        text = snippet['text'].replace("\n", " ")
+        if options['remove_annotations']:
+            text = ANNOTATION_PATTERN.sub(" ", text)
+        if options['remove_fillers']:
+            text = FILLER_PATTERN.sub(" ", text)
+        if options['collapse_repeats']:
+            text = REPEATED_WORD_PATTERN.sub(r"\1", text)
+        words = text.split()
+        if options['remove_overlap']:
+            words = strip_caption_overlap(previous_words, words)
+        if not words:
+            continue
+        previous_words = (previous_words + words)[-MAX_CAPTION_OVERLAP_WORDS:]
+        segments.append({
+            'start': snippet['start'],
+            'duration': snippet['duration'],
+            'text': " ".join(words)
+        })
+
+    cleaned_text = " ".join(segment['text'] for segment in segments)
+    original_text = " ".join(snippet['text'] for snippet in timestamps_data)
+    original_words = len(original_text.split())
+    cleaned_words = len(cleaned_text.split())
+    stats = {
+        'original_words': original_words,
+        'cleaned_words': cleaned_words,
+        'original_chars': len(original_text),
+        'cleaned_chars': len(cleaned_text),
+        'compression_ratio': cleaned_words / original_words if original_words else 1.0
+    }
+    return cleaned_text, segments, stats
+
 def generate_gemini_content(transcript_text, prompt):
     """Generate content using Gemini"""
     model = genai.GenerativeModel("gemini-2.5-flash")
     response = model.generate_content(prompt + transcript_text)
     return response.text
 
+SUMMARY_WORD_COUNTS = {
+    "Brief (150 words)": 150,
+    "Medium (250 words)": 250,
+    "Detailed (400 words)": 400,
+    "Extensive (800 words)": 800
+}
+SUMMARY_FORMATS = {
+    "Bullet Points": "bullets",
+    "Paragraphs": "paragraphs"
+}
+
+def generate_summary_variants(transcript_text):
+    """Generate every summary length and format in a single structured call.
+
+    Returns a dict shaped like {"bullets": {"150": ..., "800": ...}, "paragraphs": {...}}
+    so any combination of sidebar settings can be rendered without another request.
+    """
+    word_counts = sorted(SUMMARY_WORD_COUNTS.values(), reverse=True)
+    prompt = f"""You are a YouTube video summarizer. Summarize the entire video hierarchically:
+    first write the most detailed summary (about {word_counts[0]} words), then condense it into
+    progressively shorter summaries of about {", ".join(str(n) for n in word_counts[1:])} words.
+    Each shorter summary must keep only the most important points of the longer one.
+    Write every length twice: once in bullet points and once in detailed paragraphs.
+    The summaries should always be in English, regardless of the original language.
+    
+    Respond with ONLY a JSON object of this exact shape (word counts as string keys):
+    {{"bullets": {{{", ".join(f'"{n}": "..."' for n in word_counts)}}},
+      "paragraphs": {{{", ".join(f'"{n}": "..."' for n in word_counts)}}}}}
+    
+    Transcript: """
+    
+    model = genai.GenerativeModel("gemini-2.5-flash")
+    response = model.generate_content(
+        prompt + transcript_text,
+        generation_config={"response_mime_type": "application/json"}
+    )
+    
+    text = response.text.replace("```json", "").replace("```", "").strip()
+    variants = json.loads(text)
+    for fmt in SUMMARY_FORMATS.values():
+        for word_count in word_counts:
+            if not variants.get(fmt, {}).get(str(word_count)):
+                raise ValueError(f"Summary response is missing the {word_count}-word {fmt} variant")
+    return variants
+
+def pick_summary_variant(summary_variants, summary_length, summary_format):
+    """Return the stored summary matching the sidebar settings"""
+    return summary_variants[SUMMARY_FORMATS[summary_format]][str(SUMMARY_WORD_COUNTS[summary_length])]
+
 def extract_key_timestamps(transcript_text, timestamps_data):
     """Extract key moments using AI"""
     prompt = """Analyze this video transcript and identify 5-7 key moments or important topics discussed. 
@@ -245,6 +886,236 @@ def format_timestamp(seconds):
     secs = int(seconds % 60)
     return f"{mins:02d}:{secs:02d}"
 
+# ==================== LOCAL SUMMARIZER ====================
+STOP_WORDS = set("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further get got had has
+have having he her here hers him his how i if in into is it its itself just know like me more most my
+no nor not now of off on once only or other our out over own really right same she should so some such
+than that the their them then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would yeah you your um uh okay oh gonna wanna
+""".split())
+
+def build_transcript_windows(timestamps_data, min_window_seconds=15, max_windows=500):
+    """Group transcript snippets into time windows that act as 'sentences' for extraction.
+
+    Auto-generated captions have little punctuation, so fixed time windows are more
+    reliable than sentence splitting. Long videos get wider windows so the number of
+    windows (and the similarity matrix) stays bounded.
+    """
+    if not timestamps_data:
+        return []
+
+    last = timestamps_data[-1]
+    total_duration = last['start'] + last.get('duration', 0)
+    window_seconds = max(min_window_seconds, total_duration / max_windows)
+
+    windows = []
+    for snippet in timestamps_data:
+        text = snippet['text'].strip()
+        if not text:
+            continue
+        if windows and snippet['start'] - windows[-1]['start'] < window_seconds:
+            windows[-1]['text'] += " " + text
+        else:
+            windows.append({'start': snippet['start'], 'text': text})
+    return windows
+
+def rank_transcript_windows(windows, damping=0.85, iterations=50):
+    """Score windows with TextRank over a TF-IDF cosine-similarity graph"""
+    tokenized = [[w for w in re.findall(r"[a-z0-9']+", window['text'].lower()) if w not in STOP_WORDS] for window in windows]
+    vocabulary = {}
+    rows, cols = [], []
+    for i, tokens in enumerate(tokenized):
+        for token in tokens:
+            rows.append(i)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    n = len(windows)
+    if n == 0 or not vocabulary:
+        return np.zeros(n)
+
+    term_counts = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    np.add.at(term_counts, (np.array(rows), np.array(cols)), 1.0)
+
+    document_frequency = np.count_nonzero(term_counts, axis=0)
+    tfidf = np.log1p(term_counts) * np.log((1 + n) / (1 + document_frequency) + 1).astype(np.float32)
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf /= np.where(norms == 0, 1, norms)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1.0 / n), where=row_sums > 0)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+def select_top_windows(windows, scores, word_budget):
+    """Pick the highest-ranked windows until the word budget is used, in chronological order"""
+    selected, used = [], 0
+    for index in np.argsort(-scores):
+        words = len(windows[index]['text'].split())
+        if selected and used + words > word_budget:
+            continue
+        selected.append(index)
+        used += words
+        if used >= word_budget:
+            break
+    return [windows[i] for i in sorted(selected)]
+
+def generate_local_summary_variants(timestamps_data):
+    """Extractive summary in the same shape as generate_summary_variants, computed without any API call"""
+    windows = build_transcript_windows(timestamps_data)
+    if not windows:
+        raise ValueError("Transcript is empty")
+    scores = rank_transcript_windows(windows)
+
+    variants = {fmt: {} for fmt in SUMMARY_FORMATS.values()}
+    for word_count in SUMMARY_WORD_COUNTS.values():
+        selected = select_top_windows(windows, scores, word_count)
+        variants['bullets'][str(word_count)] = "\n".join(f"- **[{format_timestamp(w['start'])}]** {w['text']}" for w in selected)
+        variants['paragraphs'][str(word_count)] = "\n\n".join(w['text'] for w in selected)
+    return variants
+
+def extract_local_key_timestamps(timestamps_data, count=6):
+    """Key moments from the top-ranked transcript windows"""
+    windows = build_transcript_windows(timestamps_data)
+    scores = rank_transcript_windows(windows)
+    top = sorted(np.argsort(-scores)[:count])
+    return "\n".join(f"{format_timestamp(windows[i]['start'])}: {windows[i]['text']}" for i in top)
+
+# ==================== ANSWER CACHE ====================
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.8"))
+MAX_CACHED_ANSWERS_PER_VIDEO = 200
+STALE_ANSWER_TTL = int(os.getenv("STALE_ANSWER_TTL", str(30 * 24 * 3600)))
+# Stop words that change what a question asks, so they are kept when normalizing questions
+QUESTION_KEY_WORDS = set("""
+no nor not never without what when where which who whom whose why how before after above below over under
+during until since
+""".split())
+QUESTION_STOP_WORDS = (STOP_WORDS - QUESTION_KEY_WORDS - {
+    "about", "against", "between", "into", "through", "from", "with", "off", "out", "up", "down"
+}) | {"video", "clip", "tell", "please", "explain", "describe", "s", "t"}
+# Words that may differ between two questions sharing an answer, mapped to one form (after plural stripping)
+QUESTION_SYNONYMS = {
+    "children": "child", "kid": "child", "people": "person", "main": "key",
+    "said": "say", "talk": "say", "mention": "say", "mentioned": "say",
+}
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and filler words, strip plural endings and map synonyms.
+
+    Negations, question words and prepositions are kept because they change the answer.
+    """
+    tokens = re.findall(r"[a-z0-9]+", question.lower())
+    tokens = [t for t in tokens if t not in QUESTION_STOP_WORDS]
+    tokens = [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t for t in tokens]
+    tokens = [QUESTION_SYNONYMS.get(t, t) for t in tokens]
+    return " ".join(tokens)
+
+def question_similarity(normalized_a, normalized_b):
+    """Cosine similarity over word unigrams and bigrams of two normalized questions.
+
+    Questions must contain the same content words to match at all, otherwise they
+    score 0: one different word ("children"/"adults", "before"/"after", "not")
+    changes the answer however long the question is. The cosine only ranks
+    questions using those words in a different order or number.
+    """
+    def features(text):
+        words = text.split()
+        return Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+    a, b = features(normalized_a), features(normalized_b)
+    if not a or not b:
+        return 0.0
+    if set(normalized_a.split()) != set(normalized_b.split()):
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items())
+    return dot / (math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values())))
+
+def transcript_fingerprint(transcript):
+    return hashlib.sha256((transcript or "").encode("utf-8")).hexdigest()
+
+def bump_answer_cache_stat(cursor, name):
+    cursor.execute('INSERT INTO answer_cache_stats (name, value) VALUES (?, 1) '
+                   'ON CONFLICT(name) DO UPDATE SET value = value + 1', (name,))
+
+def lookup_cached_answer(video_id, transcript, question, threshold=ANSWER_CACHE_THRESHOLD):
+    """Return a cached answer to the same or a near-identical question about this video and transcript, or None"""
+    normalized = normalize_question(question)
+    if not normalized:
+        return None
+    transcript_hash = transcript_fingerprint(transcript)
+    conn = sqlite3.connect("summary_history.db")
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT id, normalized_question, answer FROM answer_cache WHERE video_id = ? AND transcript_hash = ?',
+                   (video_id, transcript_hash))
+    best_id, best_answer, best_similarity = None, None, threshold
+    for cache_id, cached_question, answer in cursor.fetchall():
+        similarity = 1.0 if cached_question == normalized else question_similarity(normalized, cached_question)
+        if similarity >= best_similarity:
+            best_id, best_answer, best_similarity = cache_id, answer, similarity
+    
+    bump_answer_cache_stat(cursor, 'lookups')
+    if best_id is not None:
+        bump_answer_cache_stat(cursor, 'hits')
+        cursor.execute('UPDATE answer_cache SET hits = hits + 1 WHERE id = ?', (best_id,))
+    conn.commit()
+    conn.close()
+    return best_answer
+
+def store_cached_answer(video_id, transcript, question, answer):
+    """Cache a Gemini answer, keeping at most MAX_CACHED_ANSWERS_PER_VIDEO (most used) per video.
+
+    Answers for other versions of the transcript are kept until they are older than STALE_ANSWER_TTL.
+    """
+    normalized = normalize_question(question)
+    if not normalized:
+        return
+    transcript_hash = transcript_fingerprint(transcript)
+    conn = sqlite3.connect("summary_history.db")
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        INSERT INTO answer_cache (video_id, transcript_hash, question, normalized_question, answer, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(video_id, transcript_hash, normalized_question)
+        DO UPDATE SET question = excluded.question, answer = excluded.answer
+    ''', (video_id, transcript_hash, question, normalized, answer, datetime.now()))
+    cursor.execute('DELETE FROM answer_cache WHERE video_id = ? AND transcript_hash != ? AND created_at < ?',
+                   (video_id, transcript_hash, datetime.now() - timedelta(seconds=STALE_ANSWER_TTL)))
+    cursor.execute('''
+        DELETE FROM answer_cache WHERE video_id = ? AND id NOT IN (
+            SELECT id FROM answer_cache WHERE video_id = ? ORDER BY hits DESC, created_at DESC LIMIT ?
+        )
+    ''', (video_id, video_id, MAX_CACHED_ANSWERS_PER_VIDEO))
+    
+    conn.commit()
+    conn.close()
+
+def get_answer_cache_stats(video_id=None):
+    """Overall hit rate plus the number of cached answers (for one video if given)"""
+    conn = sqlite3.connect("summary_history.db")
+    cursor = conn.cursor()
+    
+    stats = dict(cursor.execute('SELECT name, value FROM answer_cache_stats').fetchall())
+    if video_id is None:
+        cached = cursor.execute('SELECT COUNT(*) FROM answer_cache').fetchone()[0]
+    else:
+        cached = cursor.execute('SELECT COUNT(*) FROM answer_cache WHERE video_id = ?', (video_id,)).fetchone()[0]
+    conn.close()
+    
+    lookups, hits = stats.get('lookups', 0), stats.get('hits', 0)
+    return {'lookups': lookups, 'hits': hits, 'hit_rate': hits / lookups if lookups else 0.0, 'cached_answers': cached}
+
 # ==================== EXPORT FUNCTIONS ====================
 def create_pdf(summary, video_url, language, timestamps_text=""):
     """Create PDF export"""
@@ -350,7 +1221,174 @@ def get_download_link(content, filename, file_label):
     href = f'<a href="data:{mime};base64,{b64}" download="{filename}">{file_label}</a>'
     return href
 
+# ==================== BULK EXPORT ====================
+EXPORT_FORMATS = {
+    "JSONL": "jsonl",
+    "Markdown (ZIP)": "zip",
+    "PDF (ZIP)": "pdf.zip"
+}
+
+def iter_history_rows(favorites_only=False, start_date=None, end_date=None, batch_size=50):
+    """Stream history rows as dicts without loading the whole table into memory"""
+    query = f"SELECT {', '.join(HISTORY_COLUMNS)} FROM summaries WHERE 1 = 1"
+    params = []
+    if favorites_only:
+        query += " AND is_favorite = 1"
+    if start_date:
+        query += " AND created_at >= ?"
+        params.append(str(start_date))
+    if end_date:
+        # created_at is stored as 'YYYY-MM-DD HH:MM:SS', so '<date> ~' sorts after every time on that day
+        query += " AND created_at <= ?"
+        params.append(f"{end_date} ~")
+    query += " ORDER BY created_at"
+
+    conn = sqlite3.connect("summary_history.db")
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(HISTORY_COLUMNS, row))
+    finally:
+        conn.close()
+
+def export_file_name(row, extension):
+    return f"{str(row['created_at'])[:10]}_{row['video_id']}_{row['id']}.{extension}"
+
+def export_history_jsonl(output, **filters):
+    """Write one JSON object per history row to a binary file object; returns the row count"""
+    count = 0
+    for row in iter_history_rows(**filters):
+        for key in ('timestamps', 'summary_variants'):
+            row[key] = json.loads(row[key]) if row[key] else None
+        row['is_favorite'] = bool(row['is_favorite'])
+        output.write((json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+        count += 1
+    return count
+
+def export_history_markdown_zip(output, **filters):
+    """Write a ZIP with one Markdown file per history row; returns the row count"""
+    count = 0
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for row in iter_history_rows(**filters):
+            archive.writestr(export_file_name(row, "md"),
+                             create_markdown(row['summary'], row['video_url'], row['language']))
+            count += 1
+    return count
+
+def render_export_pdf(file_name, summary, video_url, language):
+    """Render one history PDF; runs in a worker process"""
+    return file_name, create_pdf(summary, video_url, language)
+
+def export_history_pdf_zip(output, max_workers=4, **filters):
+    """Write a ZIP with one PDF per history row.
+
+    FPDF rendering is CPU-bound pure Python, so PDFs are rendered in worker
+    processes; at most max_workers * 2 rows are in flight to keep memory bounded.
+    """
+    if not PDF_AVAILABLE:
+        raise RuntimeError("PDF export unavailable: fpdf is not installed")
+
+    count = 0
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive, \
+            ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = []
+        for row in iter_history_rows(**filters):
+            # Only the fields the PDF needs are sent to the worker, not the transcript
+            pending.append(executor.submit(render_export_pdf, export_file_name(row, "pdf"),
+                                           row['summary'], row['video_url'], row['language']))
+            if len(pending) >= max_workers * 2:
+                archive.writestr(*pending.pop(0).result())
+                count += 1
+        for future in pending:
+            archive.writestr(*future.result())
+            count += 1
+    return count
+
+def export_history(output, export_format, **filters):
+    """Stream the history to `output` in the given EXPORT_FORMATS extension; returns the row count"""
+    exporters = {
+        "jsonl": export_history_jsonl,
+        "zip": export_history_markdown_zip,
+        "pdf.zip": export_history_pdf_zip
+    }
+    return exporters[export_format](output, **filters)
+
 # ==================== STREAMLIT UI ====================
+def summarize_transcript(pending_summary, summary_engine, show_timestamps):
+    """Summarize the transcript in the session store and make it the current summary"""
+    transcript_text = session_get('transcript')
+    timestamps_data = session_get('timestamps_data')
+    
+    # All lengths and formats come back from one call, so changing settings later is instant
+    engine_used = summary_engine
+    summary_variants = None
+    if summary_engine == "Gemini (AI)":
+        try:
+            with st.spinner("🤖 Generating AI summary..."):
+                summary_variants = generate_summary_variants(transcript_text)
+        except Exception as e:
+            st.warning(f"⚠️ Gemini unavailable ({e}). Falling back to the fast local summarizer.")
+            engine_used = "Fast (local)"
+    if summary_variants is None:
+        summary_variants = generate_local_summary_variants(timestamps_data)
+    
+    # Extract key timestamps if enabled
+    timestamps_text = ""
+    if show_timestamps:
+        if engine_used == "Gemini (AI)":
+            try:
+                with st.spinner("⏱️ Extracting key moments..."):
+                    timestamps_text = extract_key_timestamps(transcript_text, timestamps_data)
+            except Exception:
+                timestamps_text = extract_local_key_timestamps(timestamps_data)
+        else:
+            timestamps_text = extract_local_key_timestamps(timestamps_data)
+    
+    session_put('summary_variants', summary_variants)
+    st.session_state['current_summary_data'] = {
+        **pending_summary,
+        'timestamps_text': timestamps_text,
+        'summary_engine': engine_used,
+        'generated_at': datetime.now()
+    }
+    
+    # Also update chat context
+    st.session_state['current_video_url'] = pending_summary['youtube_link']
+
+def reuse_saved_summary(pending_summary, summary_id, summary_engine, show_timestamps):
+    """Make a saved history summary the current summary without calling Gemini.
+
+    Summarizes the transcript instead if the history row was deleted meanwhile.
+    Returns True if the saved summary was reused.
+    """
+    row = get_summary_by_id(summary_id)
+    if row is None:
+        st.warning("⚠️ The matching summary was deleted from history. Generating a new summary instead.")
+        summarize_transcript(pending_summary, summary_engine, show_timestamps)
+        return False
+    if row['summary_variants']:
+        summary_variants = json.loads(row['summary_variants'])
+    else:
+        # Rows saved before summary variants existed only have the one summary
+        summary_variants = {fmt: {str(n): row['summary'] for n in SUMMARY_WORD_COUNTS.values()}
+                            for fmt in SUMMARY_FORMATS.values()}
+    
+    session_put('summary_variants', summary_variants)
+    timestamps_data = session_get('timestamps_data')
+    st.session_state['current_summary_data'] = {
+        **pending_summary,
+        'timestamps_text': extract_local_key_timestamps(timestamps_data) if timestamps_data else "",
+        'summary_engine': "History",
+        'reused_from': row['title'],
+        'generated_at': datetime.now()
+    }
+    st.session_state['current_video_url'] = pending_summary['youtube_link']
+    return True
+
 def main():
     # Page config
     st.set_page_config(
@@ -536,10 +1574,27 @@ def main():
         
         st.markdown("---")
         st.markdown("### ⚙️ Settings")
-        summary_length = st.selectbox("Summary Length", ["Brief (150 words)", "Medium (250 words)", "Detailed (400 words)", "Extensive (800 words)"])
-        summary_format = st.radio("Summary Format", ["Bullet Points", "Paragraphs"])
+        summary_length = st.selectbox("Summary Length", list(SUMMARY_WORD_COUNTS))
+        summary_format = st.radio("Summary Format", list(SUMMARY_FORMATS))
+        summary_engine = st.radio("Summary Engine", ["Gemini (AI)", "Fast (local)"],
+                                  help="Fast (local) extracts key transcript passages instantly without an API call")
         show_timestamps = st.checkbox("Show Key Timestamps", value=True)
+        clean_transcript = st.checkbox("Clean Transcript", value=True,
+                                       help="Strip [Music]/[Applause] tags, filler words and repeated caption text before any AI call")
+        
+        memory_stats = get_session_manager().stats()
+        st.caption(
+            f"🧠 Session data: {get_session_manager().session_bytes(get_session_id()) / 1024:.0f} KB · "
+            f"Server: {memory_stats['resident_bytes'] / (1024 * 1024):.1f} MB in memory, "
+            f"{memory_stats['spilled_bytes'] / (1024 * 1024):.1f} MB on disk"
+        )
         
+    # Session data is only dropped after SESSION_EXPIRE_TTL of inactivity
+    if st.session_state.get('current_video_url') and not session_has('transcript'):
+        st.warning("⌛ This session's video data expired after a long period of inactivity. Please summarize the video again.")
+        st.session_state.pop('current_video_url')
+        st.session_state.pop('current_summary_data', None)
+    
     # ==================== PAGE: SUMMARIZE ====================
     # ==================== PAGE: SUMMARIZE ====================
     if page == "📝 Summarize":
@@ -554,11 +1609,18 @@ def main():
         
         col1, col2 = st.columns([2, 1])
         
+        video_metadata = None
         with col1:
             if youtube_link:
                 try:
                     video_id = extract_video_id(youtube_link)
-                    st.image(f"http://img.youtube.com/vi/{video_id}/0.jpg", use_column_width=True)
+                    if not is_valid_video_id(video_id):
+                        raise ValueError(f"Invalid video ID: '{video_id}'")
+                    # Served from the local cache after the first fetch
+                    video_metadata = get_video_metadata(video_id)
+                    st.image(video_metadata['thumbnail_path'] or f"http://img.youtube.com/vi/{video_id}/0.jpg", use_column_width=True)
+                    if video_metadata['title']:
+                        st.markdown(f"**{video_metadata['title']}**  \n{video_metadata['channel'] or ''}")
                 except:
                     st.warning("Could not load video thumbnail")
         
@@ -571,6 +1633,13 @@ def main():
                     <p>🎬 Video Ready</p>
                 </div>
                 """, unsafe_allow_html=True)
+                if video_metadata and video_metadata['duration']:
+                    st.markdown(f"""
+                    <div class="stats-box">
+                        <h3>Duration</h3>
+                        <p>{format_duration(video_metadata['duration'])}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
         
         if st.button("✨ Generate Summary", type="primary", use_container_width=True):
             if not youtube_link:
@@ -579,49 +1648,31 @@ def main():
                 try:
                     with st.spinner("🔄 Extracting transcript..."):
                         transcript_text, detected_language, timestamps_data = extract_transcript_details(youtube_link)
+                        if timestamps_data:
+                            set_video_duration(video_id, timestamps_data[-1]['start'] + timestamps_data[-1]['duration'])
+                        # Cleaned once here; summary, chat and mind map all reuse the cleaned text
+                        cleanup_options = None if clean_transcript else {key: False for key in TRANSCRIPT_CLEANUP}
+                        transcript_text, timestamps_data, cleanup_stats = preprocess_transcript(timestamps_data, cleanup_options)
                     
-                    # Determine word count based on selection
-                    # Determine word count based on selection
-                    word_counts = {
-                        "Brief (150 words)": 150, 
-                        "Medium (250 words)": 250, 
-                        "Detailed (400 words)": 400,
-                        "Extensive (800 words)": 800
-                    }
-                    word_count = word_counts[summary_length]
-                    
-                    # Format instruction
-                    format_instruction = "in bullet points" if summary_format == "Bullet Points" else "in detailed paragraphs"
-                    
-                    prompt = f"""You are a YouTube video summarizer. Summarize the entire video and provide 
-                    the important summary {format_instruction} within {word_count} words. The summary should always be in English, 
-                    regardless of the original language. Please provide the summary of the text given here: """
-                    
-                    with st.spinner("🤖 Generating AI summary..."):
-                        summary = generate_gemini_content(transcript_text, prompt)
-                    
-                    # Extract key timestamps if enabled
-                    timestamps_text = ""
-                    if show_timestamps:
-                        with st.spinner("⏱️ Extracting key moments..."):
-                            timestamps_text = extract_key_timestamps(transcript_text, timestamps_data)
-                    
-                    # Store results in session state for persistence
-                    st.session_state['current_summary_data'] = {
-                        'summary': summary,
-                        'transcript_text': transcript_text,
+                    # Large artifacts live in the shared session store; session state keeps the small fields
+                    session_put('transcript', transcript_text)
+                    session_put('timestamps_data', timestamps_data)
+                    pending_summary = {
+                        'transcript_words': cleanup_stats['cleaned_words'],
+                        'cleanup_stats': cleanup_stats,
                         'detected_language': detected_language,
-                        'timestamps_data': timestamps_data,
-                        'timestamps_text': timestamps_text,
                         'video_id': video_id,
-                        'youtube_link': youtube_link,
-                        'generated_at': datetime.now()
+                        'youtube_link': youtube_link
                     }
                     
-                    # Also update chat context
-                    st.session_state['current_transcript'] = transcript_text
-                    st.session_state['current_video_url'] = youtube_link
+                    # Offer an existing summary of a near-identical transcript before spending an LLM call
+                    duplicate_match = find_near_duplicate(transcript_text)
+                    if duplicate_match:
+                        st.session_state['pending_summary'] = pending_summary
+                        st.session_state['duplicate_match'] = duplicate_match
+                        st.rerun()
                     
+                    summarize_transcript(pending_summary, summary_engine, show_timestamps)
                     st.success("✅ Summary generated successfully!")
                     st.rerun() # Rerun to display data from state
                     
@@ -629,9 +1680,39 @@ def main():
                     st.error(f"❌ Error: {str(e)}")
                     st.info("💡 Tips:\n- Ensure the video has captions/subtitles\n- Check the YouTube URL\n- Try a different video")
 
+        # Near-duplicate of a saved summary: let the user reuse it or generate a fresh one
+        if ('duplicate_match' in st.session_state
+                and st.session_state['pending_summary']['youtube_link'] == youtube_link):
+            match = st.session_state['duplicate_match']
+            st.info(f"♻️ This transcript is {match['similarity']:.0%} similar to **{match['title']}** "
+                    f"(saved {str(match['created_at'])[:16]}). Reuse that summary instantly?")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("♻️ Reuse Existing Summary", use_container_width=True):
+                    try:
+                        # A fallback summary is shown in this run so its warning stays visible
+                        if reuse_saved_summary(st.session_state.pop('pending_summary'),
+                                               st.session_state.pop('duplicate_match')['summary_id'],
+                                               summary_engine, show_timestamps):
+                            st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Error: {str(e)}")
+            with col2:
+                if st.button("✨ Generate New Summary", use_container_width=True):
+                    try:
+                        st.session_state.pop('duplicate_match')
+                        summarize_transcript(st.session_state.pop('pending_summary'), summary_engine, show_timestamps)
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Error: {str(e)}")
+        
         # Display results from Session State if they exist
-        if 'current_summary_data' in st.session_state and st.session_state['current_summary_data']['youtube_link'] == youtube_link:
-            data = st.session_state['current_summary_data']
+        if ('current_summary_data' in st.session_state
+                and st.session_state['current_summary_data']['youtube_link'] == youtube_link
+                and session_has('summary_variants')):
+            data = dict(st.session_state['current_summary_data'])
+            summary_variants = session_get('summary_variants')
+            data['summary'] = pick_summary_variant(summary_variants, summary_length, summary_format)
             
             # Stats
             col1, col2, col3, col4 = st.columns(4)
@@ -659,16 +1740,23 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
             with col4:
-                transcript_words = len(data['transcript_text'].split())
+                transcript_words = data['transcript_words']
+                saved_percent = round((1 - data['cleanup_stats']['compression_ratio']) * 100)
                 st.markdown(f"""
                 <div class="stats-box">
                     <h3>Transcript</h3>
                     <p>{transcript_words} words</p>
                 </div>
                 """, unsafe_allow_html=True)
+                if saved_percent > 0:
+                    st.caption(f"🧹 Cleaned from {data['cleanup_stats']['original_words']} words (-{saved_percent}%)")
             
             # Summary
             st.markdown("## 📋 Summary")
+            if data['summary_engine'] == "Fast (local)":
+                st.caption("⚡ Extractive summary generated locally from the transcript")
+            elif data['summary_engine'] == "History":
+                st.caption(f"♻️ Reused from saved summary: {data['reused_from']}")
             st.write(data['summary'])
             
             # Timestamps
@@ -714,8 +1802,9 @@ def main():
             with col4:
                 if st.button("💾 Save to History"):
                     save_to_history(
-                        data['video_id'], data['youtube_link'], f"Video {data['video_id']}", 
-                        data['summary'], data['transcript_text'], data['detected_language'], data['timestamps_data']
+                        data['video_id'], data['youtube_link'], (video_metadata or {}).get('title') or f"Video {data['video_id']}",
+                        data['summary'], session_get('transcript', ""), data['detected_language'], session_get('timestamps_data', []),
+                        summary_variants
                     )
                     st.success("Saved to history!")
     
@@ -724,20 +1813,20 @@ def main():
         st.markdown('<h1 class="main-header">🗺️ Visual Mind Map</h1>', unsafe_allow_html=True)
         st.markdown("### Visualize the key concepts and connections")
         
-        if 'current_transcript' not in st.session_state:
+        if not session_has('transcript'):
             st.warning("⚠️ Please summarize a video first to generate a mind map!")
             st.info("Go to the 'Summarize' page and process a video.")
         else:
             if st.button("✨ Generate Mind Map", type="primary"):
                 try:
                     with st.spinner("🧠 Visualizing content..."):
-                        dot_code = generate_mind_map_code(st.session_state['current_transcript'])
-                        st.session_state['mind_map_code'] = dot_code
+                        dot_code = generate_mind_map_code(session_get('transcript'))
+                        session_put('mind_map_code', dot_code)
                 except Exception as e:
                     st.error(f"Failed to generate mind map: {e}")
             
-            if 'mind_map_code' in st.session_state:
-                st.graphviz_chart(st.session_state['mind_map_code'], use_container_width=True)
+            if session_has('mind_map_code'):
+                st.graphviz_chart(session_get('mind_map_code'), use_container_width=True)
                 
                 st.info("💡 You can zoom and pan the diagram if it's large.")
 
@@ -746,34 +1835,51 @@ def main():
         st.markdown('<h1 class="main-header">💬 Chat with Video</h1>', unsafe_allow_html=True)
         st.markdown("### Ask questions about the video content!")
         
-        if 'current_transcript' not in st.session_state:
+        if not session_has('transcript'):
             st.warning("⚠️ Please summarize a video first to enable chat!")
             st.info("Go to the 'Summarize' page and process a video.")
         else:
             st.success(f"✅ Ready to chat about: {st.session_state.get('current_video_url', 'Current video')}")
             
             # Chat interface
-            if 'chat_history' not in st.session_state:
-                st.session_state['chat_history'] = []
-            
             question = st.text_input("🤔 Ask a question about the video:", placeholder="What is the main topic of this video?")
             
+            transcript = session_get('transcript')
+            try:
+                chat_video_id = extract_video_id(st.session_state.get('current_video_url', ''))
+            except Exception:
+                chat_video_id = None
+            chat_video_id = chat_video_id or transcript_fingerprint(transcript)
+            
             if st.button("🚀 Get Answer", type="primary"):
                 if question:
-                    with st.spinner("🤖 Thinking..."):
-                        answer = answer_question(question, st.session_state['current_transcript'])
-                        st.session_state['chat_history'].append({"q": question, "a": answer})
+                    # Common questions about popular videos are answered from the shared cache
+                    answer = lookup_cached_answer(chat_video_id, transcript, question)
+                    if answer is not None:
+                        append_chat_history(question, answer, cached=True)
+                    else:
+                        with st.spinner("🤖 Thinking..."):
+                            answer = answer_question(question, transcript)
+                            store_cached_answer(chat_video_id, transcript, question, answer)
+                            append_chat_history(question, answer)
+            
+            cache_stats = get_answer_cache_stats(chat_video_id)
+            st.caption(f"⚡ Answer cache: {cache_stats['cached_answers']} answers for this video · "
+                       f"{cache_stats['hit_rate']:.0%} hit rate ({cache_stats['hits']}/{cache_stats['lookups']})")
             
             # Display chat history
-            if st.session_state['chat_history']:
+            chat_history = session_get('chat_history', [])
+            if chat_history:
                 st.markdown("### 💭 Conversation History")
-                for i, chat in enumerate(reversed(st.session_state['chat_history'])):
+                for i, chat in enumerate(reversed(chat_history)):
                     st.markdown(f'<div class="user-message">{chat["q"]}</div>', unsafe_allow_html=True)
                     st.markdown(f'<div class="chat-message">{chat["a"]}</div>', unsafe_allow_html=True)
+                    if chat.get("cached"):
+                        st.caption("⚡ Answered from cache")
                     st.markdown("<br>", unsafe_allow_html=True)
                 
                 if st.button("🗑️ Clear Chat History"):
-                    st.session_state['chat_history'] = []
+                    session_drop('chat_history')
                     st.rerun()
     
     # ==================== PAGE: HISTORY ====================
@@ -787,13 +1893,57 @@ def main():
         else:
             st.markdown(f"### Total Summaries: {len(history)}")
             
+            if st.button("🖼️ Fetch Missing Titles & Thumbnails"):
+                with st.spinner("🖼️ Fetching video details..."):
+                    prefetch_video_metadata([row[1] for row in history])
+                st.rerun()
+            
+            with st.expander("📦 Bulk Export"):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    export_label = st.selectbox("Format", list(EXPORT_FORMATS))
+                with col2:
+                    export_range = st.date_input("Date range", value=())
+                with col3:
+                    export_favorites = st.checkbox("Favorites only")
+                
+                export_format = EXPORT_FORMATS[export_label]
+                start_date = export_range[0] if len(export_range) > 0 else None
+                end_date = export_range[1] if len(export_range) > 1 else start_date
+                
+                def build_export():
+                    # Runs only when the download is clicked, and nothing is kept around between reruns.
+                    # Rows are streamed into a temp file that is always removed afterwards.
+                    export_file = tempfile.NamedTemporaryFile(suffix=f".{export_format}", delete=False)
+                    try:
+                        with export_file:
+                            export_history(export_file, export_format, favorites_only=export_favorites,
+                                           start_date=start_date, end_date=end_date)
+                        return Path(export_file.name).read_bytes()
+                    finally:
+                        os.unlink(export_file.name)
+                
+                st.download_button(
+                    label="⬇️ Download Export",
+                    data=build_export,
+                    file_name=f"summary_history.{export_format}",
+                    mime="application/zip" if export_format.endswith("zip") else "application/jsonl"
+                )
+            
             for row in history:
-                summary_id, video_id, video_url, title, summary, transcript, language, timestamps, created_at, is_favorite = row
+                summary_id, video_id, video_url, title, summary, transcript, language, timestamps, created_at, is_favorite, summary_variants = row
+                if summary_variants:
+                    summary = pick_summary_variant(json.loads(summary_variants), summary_length, summary_format)
                 
                 with st.expander(f"{'⭐' if is_favorite else '📹'} {title} - {created_at}"):
                     col1, col2 = st.columns([3, 1])
                     
                     with col1:
+                        video_metadata = get_cached_metadata(video_id)
+                        if video_metadata and video_metadata['thumbnail_path']:
+                            st.image(video_metadata['thumbnail_path'], width=240)
+                        if video_metadata and video_metadata['channel']:
+                            st.markdown(f"**Channel:** {video_metadata['channel']}")
                         st.markdown(f"**URL:** {video_url}")
                         st.markdown(f"**Language:** {language}")
                         st.markdown(f"**Created:** {created_at}")
@@ -812,9 +1962,10 @@ def main():
                     
                     # Load to chat
                     if st.button("💬 Load for Chat", key=f"chat_{summary_id}"):
-                        st.session_state['current_transcript'] = transcript
+                        session_put('transcript', transcript)
+                        session_drop('mind_map_code')
                         st.session_state['current_video_url'] = video_url
-                        st.session_state['chat_history'] = [] # Reset chat history for new video
+                        session_drop('chat_history') # Reset chat history for new video
                         st.session_state['page_selection'] = "💬 Chat with Video" # Switch page safe method
                         st.rerun()
     
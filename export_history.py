@@ -0,0 +1,40 @@
+"""Headless bulk export of summary_history.db.
+
+Streams rows from the history database in constant memory and writes JSONL,
+a ZIP of per-video Markdown files, or a ZIP of PDFs rendered in parallel.
+
+Usage:
+    python export_history.py --format jsonl --output history.jsonl
+    python export_history.py --format zip --output history.zip --favorites --since 2025-01-01
+"""
+import argparse
+from datetime import date
+from pathlib import Path
+
+from app import EXPORT_FORMATS, export_history, init_database
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the summary history")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS.values()), default="jsonl",
+                        help="jsonl, zip (Markdown) or pdf.zip")
+    parser.add_argument("--output", required=True, help="Output file path")
+    parser.add_argument("--favorites", action="store_true", help="Only export favorites")
+    parser.add_argument("--since", type=date.fromisoformat, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel PDF renderers (pdf.zip only)")
+    args = parser.parse_args()
+
+    if not Path("summary_history.db").exists():
+        parser.error("summary_history.db not found; run this from the folder the app runs in")
+    init_database()  # bring databases written by older versions of the app up to the current schema
+
+    filters = {'favorites_only': args.favorites, 'start_date': args.since, 'end_date': args.until}
+    if args.format == "pdf.zip":
+        filters['max_workers'] = args.workers
+
+    with open(args.output, "wb") as output:
+        count = export_history(output, args.format, **filters)
+    print(f"Exported {count} summaries to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Multi-session load test for the YouTube Summarizer Streamlit app.
+
+Drives N simulated sessions through Summarize -> Save -> History -> Chat using
+Streamlit's AppTest harness. The transcript API and Gemini are replaced with
+stubs that sleep for a configurable latency, and metadata/thumbnail requests
+are disabled, so the numbers reflect the app's own rerun cost plus realistic
+blocking time rather than network noise.
+
+AppTest is not thread-safe (it swaps a process-global Runtime on every run),
+so sessions cannot be driven concurrently inside one interpreter. Each
+simulated session therefore runs in its own process, and they share only
+summary_history.db. This measures per-rerun cost and SQLite contention. It does
+not measure the GIL or the shared SessionDataManager that sessions in one
+server process compete for. The saturation point is an upper bound that
+mostly reflects available CPU cores.
+
+Sessions that fail are reported but excluded from latency and throughput.
+Levels with failures are left out of the saturation estimate.
+
+Usage:
+    python load_test.py --sessions 1,2,4,8,16 --llm-latency 0.5
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = str(Path(__file__).resolve().parent / "app.py")
+WORDS = ("model data training network video speaker example result problem idea "
+         "system people question answer method value change future research topic").split()
+
+# ==================== STUB BACKENDS ====================
+class StubSnippet:
+    def __init__(self, text, start, duration):
+        self.text = text
+        self.start = start
+        self.duration = duration
+
+class StubTranscript:
+    language = "English"
+    language_code = "en"
+    is_generated = True
+    is_translatable = False
+
+    def __init__(self, video_id, snippets, latency):
+        self.video_id = video_id
+        self.snippets = snippets
+        self.latency = latency
+
+    def fetch(self):
+        time.sleep(self.latency)
+        rng = random.Random(self.video_id)
+        return [StubSnippet(" ".join(rng.choice(WORDS) for _ in range(8)), i * 3.0, 3.0)
+                for i in range(self.snippets)]
+
+class StubTranscriptList:
+    def __init__(self, transcript):
+        self.transcript = transcript
+
+    def find_transcript(self, languages):
+        return self.transcript
+
+    def __iter__(self):
+        return iter([self.transcript])
+
+def make_transcript_api(snippets, latency):
+    class StubTranscriptApi:
+        def list(self, video_id):
+            return StubTranscriptList(StubTranscript(video_id, snippets, latency))
+    return StubTranscriptApi
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+def make_generative_model(latency):
+    class StubGenerativeModel:
+        def __init__(self, model_name):
+            self.model_name = model_name
+
+        def generate_content(self, prompt, **kwargs):
+            time.sleep(latency)
+            if "JSON object" in prompt:
+                return StubResponse(json.dumps({
+                    fmt: {str(n): " ".join(random.choice(WORDS) for _ in range(n)) for n in (150, 250, 400, 800)}
+                    for fmt in ("bullets", "paragraphs")
+                }))
+            if "Graphviz" in prompt:
+                return StubResponse('digraph MindMap { rankdir=LR; "Topic" -> "Idea"; }')
+            return StubResponse(" ".join(random.choice(WORDS) for _ in range(60)))
+    return StubGenerativeModel
+
+# ==================== SESSION FLOW ====================
+def click(at, label):
+    next(b for b in at.button if b.label == label).click().run()
+
+def go_to(at, page):
+    at.sidebar.radio[0].set_value(page).run()
+
+def run_session(session_index, args):
+    """Run one realistic user flow in a worker process.
+
+    Returns (timings by action, start time, end time, error message or None).
+    """
+    timings = defaultdict(list)
+
+    def timed(action, step):
+        start = time.perf_counter()
+        step()
+        elapsed = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"{action} failed: {at.exception[0].message}")
+        timings[action].append(elapsed)
+
+    with mock.patch("youtube_transcript_api.YouTubeTranscriptApi", make_transcript_api(args.snippets, args.transcript_latency)), \
+         mock.patch("google.generativeai.GenerativeModel", make_generative_model(args.llm_latency)), \
+         mock.patch("google.generativeai.configure"), \
+         mock.patch("urllib.request.urlopen", side_effect=OSError("network disabled in load test")):
+        at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        at.run()  # warm-up: imports and first compile are not part of a user-visible rerun
+        at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        started = time.time()
+        try:
+            run_flow(at, session_index, timed)
+            error = None
+        except Exception as e:
+            error = f"session {session_index}: {e!r}"
+        return dict(timings), started, time.time(), error
+
+def run_flow(at, session_index, timed):
+    video_url = f"https://www.youtube.com/watch?v={session_index:011d}"
+
+    timed("load", lambda: at.run())
+    timed("enter url", lambda: at.text_input(key="url_input").input(video_url).run())
+    timed("summarize", lambda: click(at, "✨ Generate Summary"))
+    if any(b.label == "♻️ Reuse Existing Summary" for b in at.button):
+        # Near-duplicate of a saved transcript (e.g. --sessions repeats a level): take the reuse path
+        timed("reuse summary", lambda: click(at, "♻️ Reuse Existing Summary"))
+    timed("save", lambda: click(at, "💾 Save to History"))
+    timed("history", lambda: go_to(at, "📚 History"))
+    timed("chat page", lambda: go_to(at, "💬 Chat with Video"))
+    for question in ("What is the main topic?", "Summarize the conclusion"):
+        timed("ask question", lambda: at.text_input[0].input(question).run())
+        timed("chat answer", lambda: click(at, "🚀 Get Answer"))
+
+def run_level(sessions, args, first_session_index=0):
+    """Run `sessions` concurrent sessions and return (timings, wall_time, errors).
+
+    Timings and wall time only cover sessions that completed the whole flow.
+    """
+    timings = defaultdict(list)
+    errors = []
+    starts, ends = [], []
+    with ProcessPoolExecutor(max_workers=sessions) as executor:
+        # Every session gets its own video ID, unique across levels, so each level summarizes fresh videos
+        futures = [executor.submit(run_session, first_session_index + i, args) for i in range(sessions)]
+        for future in futures:
+            session_timings, started, ended, error = future.result()
+            if error:
+                errors.append(error)
+                continue
+            for action, values in session_timings.items():
+                timings[action].extend(values)
+            starts.append(started)
+            ends.append(ended)
+    wall_time = max(ends) - min(starts) if starts else 0.0
+    return timings, wall_time, errors
+
+# ==================== REPORTING ====================
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def print_level_report(sessions, timings, wall_time, errors):
+    reruns = sum(len(v) for v in timings.values())
+    throughput = reruns / wall_time if wall_time else 0.0
+    print(f"\n=== {sessions} concurrent session(s): {reruns} reruns in {wall_time:.2f}s "
+          f"({throughput:.1f} reruns/s, {len(errors)} failed sessions) ===")
+    print(f"{'action':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action, values in timings.items():
+        print(f"{action:<14}{len(values):>7}"
+              f"{percentile(values, 50) * 1000:>10.0f}{percentile(values, 95) * 1000:>10.0f}"
+              f"{percentile(values, 99) * 1000:>10.0f}{max(values) * 1000:>10.0f}")
+    for error in errors[:5]:
+        print(f"  ! {error}")
+
+def find_saturation(results, min_gain=0.10):
+    """First concurrency level whose throughput gain over the previous level is below min_gain"""
+    previous = None
+    for sessions, throughput in results:
+        if previous and throughput < previous[1] * (1 + min_gain):
+            return previous[0]
+        previous = (sessions, throughput)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the YouTube Summarizer Streamlit app")
+    parser.add_argument("--sessions", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--snippets", type=int, default=1200, help="Caption snippets per stub transcript")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds each stub Gemini call blocks")
+    parser.add_argument("--transcript-latency", type=float, default=0.3, help="Seconds each stub transcript fetch blocks")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-rerun timeout in seconds")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.sessions.split(",")]
+    workdir = tempfile.mkdtemp(prefix="summarizer_load_")
+    os.chdir(workdir)  # keep summary_history.db and spill files out of the project folder
+    print(f"Working directory: {workdir}")
+
+    results = []
+    for level_index, sessions in enumerate(levels):
+        timings, wall_time, errors = run_level(sessions, args, sum(levels[:level_index]))
+        print_level_report(sessions, timings, wall_time, errors)
+        throughput = sum(len(v) for v in timings.values()) / wall_time if wall_time else 0.0
+        results.append((sessions, throughput, len(errors)))
+
+    print("\n=== Throughput by concurrency ===")
+    for sessions, throughput, failed in results:
+        note = f" ({failed} failed sessions, excluded from saturation)" if failed else ""
+        print(f"{sessions:>4} session(s): {throughput:.1f} reruns/s{note}")
+    saturation = find_saturation([(sessions, throughput) for sessions, throughput, failed in results if not failed])
+    if saturation:
+        print(f"Saturation point: ~{saturation} concurrent sessions (throughput stops scaling beyond this)")
+    else:
+        print("Saturation point not reached; try higher --sessions levels")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+import sqlite3
+
+import pytest
+
+import app
+
+VIDEO_ID = "dQw4w9WgXcQ"
+TRANSCRIPT_A = "the speaker explains how the new drug was tested in a clinical trial"
+TRANSCRIPT_B = "die sprecherin erklaert wie das neue medikament getestet wurde"
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app.init_database()
+
+
+def cached_hits(question):
+    conn = sqlite3.connect("summary_history.db")
+    hits = conn.execute('SELECT hits FROM answer_cache WHERE normalized_question = ?',
+                        (app.normalize_question(question),)).fetchone()[0]
+    conn.close()
+    return hits
+
+
+def test_rephrased_question_hits():
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?", "Drug trials")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "what's the main topic of this video") == "Drug trials"
+
+
+@pytest.mark.parametrize("question", ["Who is he?", "Why?", "How?"])
+def test_short_questions_do_not_share_answers(question):
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is this video about?", "Drug trials")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, question) is None
+
+
+def test_before_and_after_do_not_share_answers():
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What happened before the trial?", "Lab tests")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What happened after the trial?") is None
+
+
+def test_negated_question_does_not_share_answer():
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "Is the drug safe?", "Yes")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "Is the drug not safe?") is None
+
+
+def test_question_with_only_filler_words_is_never_cached():
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "Is it?", "Yes")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "Is it?") is None
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "Was it?") is None
+    assert app.get_answer_cache_stats(VIDEO_ID)['cached_answers'] == 0
+
+
+def test_lookup_with_other_transcript_keeps_cached_answers():
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?", "Drug trials")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_B, "What is the main topic?") is None
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?") == "Drug trials"
+
+
+def test_stale_transcript_answers_expire_on_store():
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?", "Drug trials")
+    conn = sqlite3.connect("summary_history.db")
+    conn.execute('UPDATE answer_cache SET created_at = ?',
+                 (datetime.now() - timedelta(seconds=app.STALE_ANSWER_TTL + 60),))
+    conn.commit()
+    conn.close()
+
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_B, "Was ist das Hauptthema?", "Medikamente")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?") is None
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_B, "Was ist das Hauptthema?") == "Medikamente"
+
+
+def test_restore_keeps_hits_and_updates_answer():
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?", "Drug trials")
+    app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?")
+    app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?")
+
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What's the main topic?", "Clinical drug trials")
+    assert cached_hits("What is the main topic?") == 2
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What is the main topic?") == "Clinical drug trials"
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("What does the speaker say about the risks of the drug in children?",
+     "What does the speaker say about the risks of the drug in adults?"),
+    ("What happened at the first conference in Paris?",
+     "What happened at the second conference in Paris?"),
+])
+def test_long_questions_differing_in_one_word_do_not_share_answers(stored, asked):
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, stored, "Cached answer")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A, asked) is None
+
+
+def test_synonyms_share_answers():
+    app.store_cached_answer(VIDEO_ID, TRANSCRIPT_A, "What does the speaker say about kids?", "Keep it away from them")
+    assert app.lookup_cached_answer(VIDEO_ID, TRANSCRIPT_A,
+                                    "What did the speaker mention about children?") == "Keep it away from them"
@@ -0,0 +1,77 @@
+import app
+
+BIG_VALUE = ["word"] * 20
+
+
+def make_manager(tmp_path, budget_bytes=10_000):
+    return app.SessionDataManager(budget_bytes=budget_bytes, spill_dir=tmp_path / "spill")
+
+
+def spill_files(manager):
+    return sorted(manager.spill_dir.glob("*.json"))
+
+
+def test_shared_artifact_is_stored_once(tmp_path):
+    manager = make_manager(tmp_path)
+    manager.put("a", "transcript", BIG_VALUE)
+    manager.put("b", "transcript", BIG_VALUE)
+
+    assert manager.stats()['artifacts'] == 1
+    assert manager.resident_bytes == manager.session_bytes("a")
+    manager.release_session("a")
+    assert manager.get("b", "transcript") == BIG_VALUE
+
+
+def test_modifying_returned_value_does_not_affect_other_sessions(tmp_path):
+    manager = make_manager(tmp_path)
+    manager.put("a", "timestamps_data", [1, 2])
+    manager.put("b", "timestamps_data", [1, 2])
+
+    manager.get("a", "timestamps_data").append(3)
+    assert manager.get("b", "timestamps_data") == [1, 2]
+    assert manager.get("a", "timestamps_data") == [1, 2]
+
+
+def test_spills_other_sessions_when_over_budget(tmp_path):
+    manager = make_manager(tmp_path, budget_bytes=200)
+    manager.put("a", "transcript", BIG_VALUE)
+    manager.put("b", "transcript", BIG_VALUE + ["other"])
+
+    stats = manager.stats()
+    assert stats['resident_bytes'] <= 200
+    assert stats['spilled_bytes'] == manager.session_bytes("a")
+    assert len(spill_files(manager)) == 1
+
+
+def test_get_reloads_spilled_artifact(tmp_path):
+    manager = make_manager(tmp_path, budget_bytes=200)
+    manager.put("a", "transcript", BIG_VALUE)
+    manager.put("b", "transcript", BIG_VALUE + ["other"])
+
+    assert manager.get("a", "transcript") == BIG_VALUE
+    assert manager.stats()['spilled_bytes'] == manager.session_bytes("b")
+    assert manager.get("b", "transcript") == BIG_VALUE + ["other"]
+
+
+def test_last_release_deletes_artifact_and_spill_file(tmp_path):
+    manager = make_manager(tmp_path, budget_bytes=200)
+    manager.put("a", "transcript", BIG_VALUE)
+    manager.put("c", "transcript", BIG_VALUE)
+    manager.put("b", "transcript", BIG_VALUE + ["other"])
+    assert len(spill_files(manager)) == 1
+
+    manager.release_session("a")
+    assert len(spill_files(manager)) == 1
+    manager.drop("c", "transcript")
+    assert spill_files(manager) == []
+    assert manager.stats()['artifacts'] == 1
+    assert manager.resident_bytes == manager.session_bytes("b")
+
+
+def test_new_manager_removes_spill_files_from_earlier_process(tmp_path):
+    manager = make_manager(tmp_path, budget_bytes=200)
+    manager.put("a", "transcript", BIG_VALUE)
+    manager.put("b", "transcript", BIG_VALUE + ["other"])
+    assert spill_files(manager)
+
+    assert spill_files(make_manager(tmp_path)) == []